@@ -1,3 +1,20 @@
-from .agent import get_agent_executor
-from .graph import create_agent_graph, build_runnable_agent
-from .state import create_initial_state, AgentState, NodeNames, EdgeNames
\ No newline at end of file
+import importlib
+
+# Exported names and the submodule defining each; submodules are imported on
+# first access (PEP 562) so importing the package stays cheap
+_EXPORTS = {
+    "get_agent_executor": ".agent",
+    "create_agent_graph": ".graph",
+    "build_runnable_agent": ".graph",
+    "create_initial_state": ".state",
+    "AgentState": ".state",
+    "NodeNames": ".state",
+    "EdgeNames": ".state",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
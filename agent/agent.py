@@ -1,32 +1,83 @@
-from typing import Dict, List, Any, Optional, Tuple, Union, Callable
-import json
+from typing import Dict, List, Any, Optional, Tuple, Union, Callable, Mapping, TYPE_CHECKING
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
+import functools
+import hashlib
+import logging
+import threading
 import traceback
+import orjson
 
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, HumanMessagePromptTemplate
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-from langchain_core.runnables import RunnablePassthrough
-
-from .state import AgentState, NodeNames, EdgeNames, add_message_to_history
-
-# Import tools
-from tools.code_execution import execute_code, code_interpreter
-from tools.file_operations import read_file, write_file, get_dataframe
-from tools.azure_tools import create_search_index, upload_to_search_index, search_index
-
-# Import OpenAI client
-from utils.openai_client import get_langchain_openai_client
-
-# Define available tools
-TOOLS = {
-    "execute_code": execute_code,
-    "code_interpreter": code_interpreter,
-    "read_file": read_file,
-    "write_file": write_file,
-    "get_dataframe": get_dataframe,
-    "create_search_index": create_search_index,
-    "upload_to_search_index": upload_to_search_index,
-    "search_index": search_index
-}
+from langchain_core.runnables import Runnable, RunnablePassthrough
+
+from .state import AgentState, StateUpdate, NodeNames, EdgeNames, add_message_to_history
+
+from utils.cache import TTLCache
+
+if TYPE_CHECKING:
+    from utils.semantic_cache import SemanticCache
+
+# Tools, the OpenAI client and the embedding cache are imported on first use,
+# so loading the agent doesn't pay for pandas, the Azure SDK or numpy up front
+
+@functools.lru_cache(maxsize=None)
+def _tools() -> Dict[str, Any]:
+    """Import the available tools and return them keyed by name."""
+    from tools.code_execution import execute_code, code_interpreter
+    from tools.file_operations import read_file, read_file_full, write_file, get_dataframe
+    from tools.azure_tools import create_search_index, upload_to_search_index, search_index
+    
+    return {
+        "execute_code": execute_code,
+        "code_interpreter": code_interpreter,
+        "read_file": read_file,
+        "read_file_full": read_file_full,
+        "write_file": write_file,
+        "get_dataframe": get_dataframe,
+        "create_search_index": create_search_index,
+        "upload_to_search_index": upload_to_search_index,
+        "search_index": search_index
+    }
+
+@functools.lru_cache(maxsize=None)
+def _tool_dispatch() -> Dict[str, Tuple[Callable, Any]]:
+    """Return the underlying function and argument schema of each tool.
+    
+    Resolved once so a call is one lookup plus validation rather than a full tool invocation.
+    """
+    return {name: (tool.func, tool.args_schema) for name, tool in _tools().items()}
+
+def __getattr__(name: str) -> Any:
+    # Keep TOOLS available as a module attribute without importing the tools eagerly
+    if name == "TOOLS":
+        return _tools()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+logger = logging.getLogger(__name__)
+
+# Tools whose reads benefit from prefetching when several are batched together
+_FILE_READ_TOOLS = {"read_file", "read_file_full", "get_dataframe"}
+
+# Shared pool used to fan out independent tool calls within a single step
+_TOOL_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("TOOL_CONCURRENCY_LIMIT", 8)),
+    thread_name_prefix="agent-tool"
+)
+
+# Number of most recent messages sent verbatim; older ones are summarized
+HISTORY_WINDOW = 6
+
+# Responses to the planning, tool-calling and error-fixing prompts, reused
+# when the same request reaches the same point again. Kept short-lived since
+# the right answer depends on data that can change underneath the agent.
+_RESPONSE_CACHE = TTLCache(ttl=30 * 60)
+
+# Plans reused for new requests that mean nearly the same as an earlier one,
+# enabled when an embedding deployment is configured
+PLAN_CACHE_SIMILARITY = 0.93
 
 # System prompts
 SYSTEM_PROMPT = """You are an advanced AI assistant with the ability to use various tools to help users. 
@@ -46,426 +97,580 @@ Your goal is to help the user accomplish their tasks by following these steps:
 Be thorough but concise in your explanations.
 """
 
+TOOL_CATALOG = """Available tools:
+- execute_code(code): Run Python code and get results
+- code_interpreter(code, question): Run Python code to answer specific questions
+- read_file(file_path): Read from a file; CSV, Excel and JSON Lines files return a sample of rows, columns and row count
+- read_file_full(file_path): Read every row of a CSV, Excel, JSON or JSON Lines file, only when the sample is not enough
+- write_file(file_path, content): Write to a file
+- get_dataframe(file_path): Load data from a file into a pandas DataFrame
+- create_search_index(index_name, fields, field_types): Create an Azure Cognitive Search index
+- upload_to_search_index(index_name, data_source, field_mappings): Upload data to an Azure Search index
+- search_index(index_name, query, top, select): Search an Azure Cognitive Search index, optionally returning only the selected fields
+"""
+
+# Identical leading content for every LLM call, kept first so the provider can
+# serve it from its prompt cache; everything run-specific comes after it
+STATIC_PREFIX = f"{SYSTEM_PROMPT}\n{TOOL_CATALOG}"
+
 PLANNING_PROMPT = """Based on the user's request, create a step-by-step plan to accomplish the task.
 Be thorough but concise. Focus on how to use the available tools effectively.
 
-Available tools:
-- execute_code: Run Python code and get results
-- code_interpreter: Run Python code to answer specific questions
-- read_file: Read from a file
-- write_file: Write to a file
-- get_dataframe: Load data from a file into a pandas DataFrame
-- create_search_index: Create an Azure Cognitive Search index
-- upload_to_search_index: Upload data to an Azure Search index
-- search_index: Search an Azure Cognitive Search index
-
 User's request: {input}
 
 Your plan should be a list of steps, with each step being a specific action to take.
 """
 
-TOOL_SELECTION_PROMPT = """Based on the user's request and your plan, select the most appropriate tool to use next.
-
-Available tools:
-- execute_code: Run Python code and get results
-- code_interpreter: Run Python code to answer specific questions
-- read_file: Read from a file
-- write_file: Write to a file
-- get_dataframe: Load data from a file into a pandas DataFrame
-- create_search_index: Create an Azure Cognitive Search index
-- upload_to_search_index: Upload data to an Azure Search index
-- search_index: Search an Azure Cognitive Search index
+REASON_AND_ACT_PROMPT = """Work through your plan using the available tools.
 
 Current plan: {plan}
-Current progress: {chat_history}
-
-Select a tool from the available list and specify the required input parameters.
-Respond in JSON format:
-```json
-{{
-  "tool": "tool_name",
-  "tool_input": {{
-    "param1": "value1",
-    "param2": "value2"
-  }},
-  "reasoning": "Brief explanation of why this tool was chosen"
-}}
-```
-"""
-
-TOOL_PROCESSING_PROMPT = """Process the output from the tool and determine the next steps.
-If the tool execution was successful, update the plan and decide what to do next.
-If there was an error, we'll need to handle it.
+Latest tool calls: {tool_calls}
+Latest tool outputs: {tool_output}
 
-Tool used: {current_tool}
-Tool input: {tool_input}
-Tool output: {tool_output}
-
-Current plan: {plan}
-Current progress: {chat_history}
-
-Based on the tool output, decide what to do next:
-1. Continue with the plan (if the tool executed successfully)
-2. Report an error (if there was an error that needs handling)
-3. Generate the final output (if we've completed the plan)
-
-Respond in JSON format:
-```json
-{{
-  "decision": "continue_plan | report_error | generate_output",
-  "reasoning": "Brief explanation of your decision",
-  "updated_plan": ["Step 1", "Step 2", ...] (if applicable)
-}}
-```
+If more work is needed, call the most appropriate tool(s) next. Calls that are independent of each
+other (e.g. reading multiple files) can be made together and will run in parallel.
+If a tool reported a problem, adapt your approach.
+Once the plan is complete, do not call any tools; briefly state that you are ready to give the final answer.
 """
 
 ERROR_HANDLING_PROMPT = """An error occurred during tool execution. Let's try to fix it and adapt our approach.
 
-Tool used: {current_tool}
-Tool input: {tool_input}
-Error: {tool_output}
+Tool calls: {tool_calls}
+Tool outputs: {tool_output}
 
 Current plan: {plan}
-Current progress: {chat_history}
 Previous errors: {errors}
 Fix attempts: {error_fix_attempts}
 
-Analyze the error and provide a solution to fix it. Be adaptive in your approach.
-If the error persists after multiple attempts, consider an alternative approach.
-
-Respond in JSON format:
-```json
-{{
-  "error_analysis": "Analysis of what went wrong",
-  "solution": "Proposed solution",
-  "updated_tool": "tool_name (same or different tool)",
-  "updated_tool_input": {{
-    "param1": "value1",
-    "param2": "value2"
-  }}
-}}
-```
+Briefly explain what went wrong and how you'll fix it, then call the tool(s) again with corrected input.
+Be adaptive in your approach. If the error persists after multiple attempts, consider an alternative approach.
+If the error cannot be fixed, do not call any tools.
+"""
+
+SUMMARY_PROMPT = """Summarize the conversation below between a user and an AI assistant that uses tools.
+Keep the user's goals, the key tool results, any errors and the decisions made. Be concise.
+
+Summary so far: {summary}
+
+New messages:
+{messages}
 """
 
 FINAL_OUTPUT_PROMPT = """Based on all the interactions and tool executions, generate a comprehensive final response for the user.
 
 User's original request: {input}
 Plan executed: {plan}
-Progress and results: {chat_history}
 
 Provide a clear, concise summary of what was accomplished and any relevant results or outputs.
 If there were any limitations or issues, mention them briefly along with any suggested next steps.
 """
 
-def plan(state: AgentState) -> AgentState:
-    """Create a step-by-step plan based on the user's request."""
-    llm = get_langchain_openai_client()
-    
-    prompt = ChatPromptTemplate.from_messages([
-        SystemMessage(content=SYSTEM_PROMPT),
+def _node_prompt(template: str) -> ChatPromptTemplate:
+    """Build a node prompt: the static prefix, the chat history, then the node's template."""
+    return ChatPromptTemplate.from_messages([
+        SystemMessage(content=STATIC_PREFIX),
         MessagesPlaceholder(variable_name="chat_history"),
-        HumanMessage(content=PLANNING_PROMPT.format(input=state["input"]))
+        HumanMessagePromptTemplate.from_template(template)
     ])
-    
-    chain = prompt | llm
-    
-    response = chain.invoke({"chat_history": state["chat_history"]})
-    
-    # Extract the plan from the response
-    plan_text = response.content
+
+# Prompt templates are parsed once here; the chains pairing them with the LLM
+# are built on first use, once the Azure OpenAI configuration is available
+_PROMPTS = {
+    NodeNames.PLAN: _node_prompt(PLANNING_PROMPT),
+    NodeNames.REASON_AND_ACT: _node_prompt(REASON_AND_ACT_PROMPT),
+    NodeNames.HANDLE_ERROR: _node_prompt(ERROR_HANDLING_PROMPT),
+    NodeNames.GENERATE_FINAL_OUTPUT: _node_prompt(FINAL_OUTPUT_PROMPT),
+}
+
+# Nodes whose LLM calls the tools natively rather than answering in text
+_TOOL_CALLING_NODES = {NodeNames.REASON_AND_ACT, NodeNames.HANDLE_ERROR}
+
+_LLM = None
+_CHAINS: Optional[Dict[NodeNames, Runnable]] = None
+_PLAN_CACHE: Optional[Tuple[Any, "SemanticCache"]] = None
+_LLM_LOCK = threading.Lock()
+
+def _llm() -> Any:
+    """Return the shared LangChain chat client, creating it on first use."""
+    global _LLM
+    if _LLM is None:
+        with _LLM_LOCK:
+            if _LLM is None:
+                from utils.openai_client import get_langchain_openai_client
+                _LLM = get_langchain_openai_client()
+    return _LLM
+
+def _plan_cache() -> Optional[Tuple[Any, "SemanticCache"]]:
+    """Return the shared embeddings client and semantic plan cache, or None when not configured."""
+    global _PLAN_CACHE
+    if _PLAN_CACHE is None and os.getenv("AZURE_OPENAI_EMBEDDING_MODEL"):
+        with _LLM_LOCK:
+            if _PLAN_CACHE is None:
+                from utils.openai_client import get_langchain_openai_embeddings
+                from utils.semantic_cache import SemanticCache
+                _PLAN_CACHE = (
+                    get_langchain_openai_embeddings(),
+                    SemanticCache(os.getenv("PLAN_CACHE_PATH", os.path.join("temp", "plan_cache.npz")), threshold=PLAN_CACHE_SIMILARITY)
+                )
+    return _PLAN_CACHE
+
+def reset_clients() -> None:
+    """Drop the shared LLM clients, chains and cached responses so they are rebuilt with the current configuration."""
+    global _LLM, _CHAINS, _PLAN_CACHE
+    from utils.openai_client import reset_clients as reset_openai_clients
+    with _LLM_LOCK:
+        _LLM = None
+        _CHAINS = None
+        _PLAN_CACHE = None
+        reset_openai_clients()
+    # Responses from the previous model must not be replayed
+    _RESPONSE_CACHE.clear()
+
+def _chain(node: NodeNames) -> Runnable:
+    """Return the prompt | llm chain for a node, built once on first use."""
+    global _CHAINS
+    if _CHAINS is None:
+        llm = _llm()
+        llm_with_tools = llm.bind_tools(list(_tools().values()))
+        with _LLM_LOCK:
+            if _CHAINS is None:
+                # Tag each chain with its node so callbacks can tell the LLM calls apart
+                _CHAINS = {
+                    node_name: (prompt | (llm_with_tools if node_name in _TOOL_CALLING_NODES else llm)).with_config(
+                        run_name=node_name.value, tags=[node_name.value]
+                    )
+                    for node_name, prompt in _PROMPTS.items()
+                }
+    return _CHAINS[node]
+
+async def _stream(node: NodeNames, inputs: Dict[str, Any]) -> AIMessage:
+    """Run a node's chain token by token, so streaming callbacks see partial output, and return the full message."""
+    response = None
+    async for chunk in _chain(node).astream(inputs):
+        response = chunk if response is None else response + chunk
+    return response
+
+async def _history_for_prompt(state: AgentState, update: StateUpdate) -> List[Dict[str, str]]:
+    """Return the history sent to the LLM: a summary of older messages plus the most recent ones.
+    
+    A refreshed summary is recorded in the node's state update under "context".
+    """
+    history = state.chat_history
+    context = update.get("context", state.context)
+    summarized_upto = context.get("history_summarized_upto", 0)
+    cutoff = len(history) - HISTORY_WINDOW
+    
+    # Fold older messages into the summary once every HISTORY_WINDOW messages, not on every call
+    if cutoff - summarized_upto >= HISTORY_WINDOW:
+        from utils.openai_client import get_langchain_openai_client
+        summary_model = os.getenv("AZURE_OPENAI_SUMMARY_MODEL")
+        llm = get_langchain_openai_client(summary_model) if summary_model else _llm()
+        messages = "\n".join(f"{msg['role']}: {msg['content']}" for msg in history[summarized_upto:cutoff])
+        response = await llm.ainvoke(SUMMARY_PROMPT.format(
+            summary=context.get("history_summary", "(none)"),
+            messages=messages
+        ))
+        context = {**context, "history_summary": response.content, "history_summarized_upto": cutoff}
+        update["context"] = context
+        summarized_upto = cutoff
+    
+    if "history_summary" not in context:
+        return list(history)
+    
+    summary_message = {"role": "system", "content": f"Summary of the earlier conversation:\n{context['history_summary']}"}
+    return [summary_message, *history[summarized_upto:]]
+
+def _log_cache_usage(node: str, response: AIMessage) -> None:
+    """Log how many prompt tokens were served from the provider's prompt cache."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    cached_tokens = usage.get("input_token_details", {}).get("cache_read")
+    if cached_tokens is None:
+        token_usage = getattr(response, "response_metadata", {}).get("token_usage") or {}
+        cached_tokens = (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+    logger.debug("%s: %s prompt tokens read from cache", node, cached_tokens or 0)
+
+def _dumps(value: Any) -> str:
+    """Serialize a value as indented JSON for messages shown to the user and the LLM."""
+    return orjson.dumps(value, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+
+def _fingerprint(value: Any) -> str:
+    """Stable hash of a JSON-serializable value for use in cache keys."""
+    return hashlib.sha256(
+        orjson.dumps(value, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    ).hexdigest()
+
+def _response_cache_key(state: AgentState, node: NodeNames, *extra: Any) -> Optional[Tuple]:
+    """Build the response cache key for a node, or None when the cache is bypassed."""
+    if state.debug:
+        return None
+    return (node.value, state.input, tuple(state.plan or ()), *extra)
+
+async def plan(state: AgentState) -> StateUpdate:
+    """Create a step-by-step plan based on the user's request."""
+    update: StateUpdate = {}
+    cache_key = _response_cache_key(state, NodeNames.PLAN)
+    plan_text = _RESPONSE_CACHE.get(cache_key) if cache_key else None
+    
+    # Otherwise reuse the plan of an earlier request with nearly the same meaning
+    plan_cache = _plan_cache() if cache_key else None
+    if plan_text is None and plan_cache:
+        embeddings, semantic_cache = plan_cache
+        input_embedding = await embeddings.aembed_query(state.input)
+        match = semantic_cache.lookup(input_embedding)
+        if match:
+            plan_cache_key, plan_text = match
+        else:
+            plan_cache_key = state.input
+        # Remembered so the cached plan can be dropped if this run fails
+        update["context"] = {**state.context, "plan_cache_key": plan_cache_key}
+    
+    if plan_text is None:
+        response = await _stream(NodeNames.PLAN, {
+            "chat_history": await _history_for_prompt(state, update),
+            "input": state.input
+        })
+        _log_cache_usage(NodeNames.PLAN.value, response)
+        
+        # Extract the plan from the response
+        plan_text = response.content
+        if cache_key:
+            _RESPONSE_CACHE.set(cache_key, plan_text)
+        if plan_cache:
+            semantic_cache.set(plan_cache_key, input_embedding, plan_text)
     
     # Convert the plan text to a list
     plan_lines = plan_text.strip().split("\n")
     plan_list = [line.strip() for line in plan_lines if line.strip() and not line.strip().startswith("#")]
     
     # Update the state
-    state["plan"] = plan_list
-    state = add_message_to_history(state, "assistant", f"I'll help you with this. Here's my plan:\n\n{plan_text}")
-    
-    return state
+    update["plan"] = plan_list
+    update.update(add_message_to_history("assistant", f"I'll help you with this. Here's my plan:\n\n{plan_text}"))
+    
+    return update
+
+def _normalize_tool_calls(tool_calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Give every tool call a unique id so results can be matched back to it."""
+    normalized = []
+    seen_ids = set()
+    for i, call in enumerate(tool_calls):
+        call_id = call.get("id") or f"call_{i}"
+        if call_id in seen_ids:
+            call_id = f"{call_id}_{i}"
+        seen_ids.add(call_id)
+        normalized.append({
+            "id": call_id,
+            "tool": call["tool"],
+            "tool_input": call.get("tool_input") or {}
+        })
+    return normalized
 
-def choose_tool(state: AgentState) -> AgentState:
-    """Choose the appropriate tool based on the plan."""
-    llm = get_langchain_openai_client()
-    
-    prompt = ChatPromptTemplate.from_messages([
-        SystemMessage(content=SYSTEM_PROMPT),
-        MessagesPlaceholder(variable_name="chat_history"),
-        HumanMessage(content=TOOL_SELECTION_PROMPT.format(
-            plan=state["plan"],
-            chat_history=state["chat_history"]
-        ))
-    ])
-    
-    chain = prompt | llm
-    
-    response = chain.invoke({"chat_history": state["chat_history"]})
-    
-    # Extract the JSON from the response
-    response_text = response.content
-    
-    try:
-        # Extract JSON object if it's wrapped in ```json ... ```
-        if "```json" in response_text and "```" in response_text.split("```json", 1)[1]:
-            json_str = response_text.split("```json", 1)[1].split("```", 1)[0]
-            tool_selection = json.loads(json_str)
-        else:
-            # Try to parse the entire response as JSON
-            tool_selection = json.loads(response_text)
-        
-        # Update the state
-        state["current_tool"] = tool_selection["tool"]
-        state["tool_input"] = tool_selection["tool_input"]
-        
-        # Add to chat history
-        reasoning = tool_selection.get("reasoning", "")
-        state = add_message_to_history(
-            state, 
-            "assistant", 
-            f"I'll use the {state['current_tool']} tool with these parameters: {json.dumps(state['tool_input'], indent=2)}\n\nReasoning: {reasoning}"
-        )
+def _tool_decision(response: AIMessage) -> Dict[str, Any]:
+    """Extract the text and the native tool calls, in the agent's tool call format, from an LLM response."""
+    return {
+        "content": response.content,
+        "tool_calls": _normalize_tool_calls([
+            {"id": tool_call["id"], "tool": tool_call["name"], "tool_input": tool_call["args"]}
+            for tool_call in response.tool_calls
+        ])
+    }
+
+def _truncate(text: str, budget: int) -> str:
+    """Keep the head and tail of text that exceeds the character budget."""
+    if len(text) <= budget:
+        return text
+    # Leave room for the omission marker so the result stays within the budget
+    half = max((budget - 40) // 2, 1)
+    return f"{text[:half]}\n...[{len(text) - 2 * half} characters omitted]...\n{text[-half:]}"
+
+# Most list items or dict fields kept when a tool output is summarized
+SUMMARY_MAX_ITEMS = 20
+
+def _shrink(value: Any, budget: int) -> Any:
+    """Recursively cut strings, lists and dicts in a tool output down towards the character budget."""
+    if isinstance(value, str):
+        return _truncate(value, budget)
+    if isinstance(value, dict):
+        keys = list(value)[:SUMMARY_MAX_ITEMS]
+        field_budget = max(budget // max(len(keys), 1), 100)
+        summary = {key: _shrink(value[key], field_budget) for key in keys}
+        if len(value) > len(keys):
+            summary["..."] = f"[{len(value) - len(keys)} more fields omitted]"
+        return summary
+    if isinstance(value, (list, tuple)):
+        items = list(value[:SUMMARY_MAX_ITEMS])
+        item_budget = max(budget // max(len(items), 1), 100)
+        summary = [_shrink(item, item_budget) for item in items]
+        if len(value) > len(items):
+            summary.append(f"...[{len(value) - len(items)} more items omitted]")
+        return summary
+    return value
+
+def _summarize_tool_output(value: Any, budget: int = 2000) -> Any:
+    """Shrink a tool output to at most the character budget before it is embedded in a prompt."""
+    summary = _shrink(value, budget)
+    # Per-item minimums and scalars can still add up past the budget, so the
+    # text the prompt will contain is cut as a whole when it does
+    text = str(summary)
+    return summary if len(text) <= budget else _truncate(text, budget)
+
+def _format_tool_results(tool_calls: List[Dict[str, Any]], tool_output: Dict[str, Any]) -> str:
+    """Describe the outcome of each executed tool call for the chat history."""
+    succeeded = all(output.get("success", False) for output in tool_output.values())
+    tool_result = "success" if succeeded else "failure"
+    message = f"Tool calls execution result: {tool_result}"
+    
+    for call in tool_calls:
+        if call["id"] not in tool_output:
+            continue
+        output = tool_output[call["id"]]
         
-    except (json.JSONDecodeError, KeyError) as e:
-        # If there's an error parsing the JSON, add it to the errors list
-        state["errors"].append({
-            "type": "json_parse_error",
-            "message": str(e),
-            "response": response_text
+        if output.get("success", False):
+            # Format successful output nicely
+            output_str = _truncate(str(output), 500)
+            message += f"\n\nTool {call['tool']} ({call['id']}) output: {output_str}"
+        else:
+            # Format error nicely
+            error = output.get("error", "Unknown error")
+            message += f"\n\nTool {call['tool']} ({call['id']}) error: {error}"
+    
+    return message
+
+async def reason_and_act(state: AgentState) -> StateUpdate:
+    """Decide the next tool calls from the plan and the latest tool outputs, or finish."""
+    update: StateUpdate = {}
+    
+    # The previous calls and their outputs identify how far the run has got
+    cache_key = _response_cache_key(
+        state, NodeNames.REASON_AND_ACT, _fingerprint(state.tool_calls), _fingerprint(state.tool_output)
+    )
+    decision = _RESPONSE_CACHE.get(cache_key) if cache_key else None
+    
+    if decision is None:
+        response = await _chain(NodeNames.REASON_AND_ACT).ainvoke({
+            "chat_history": await _history_for_prompt(state, update),
+            "plan": state.plan,
+            "tool_calls": state.tool_calls,
+            "tool_output": _summarize_tool_output(state.tool_output)
         })
+        _log_cache_usage(NodeNames.REASON_AND_ACT.value, response)
         
-        # Still need to set a default tool to avoid breaking the flow
-        state["current_tool"] = "execute_code"
-        state["tool_input"] = {"code": "print('Error parsing tool selection JSON')"}
-    
-    return state
-
-def execute_tool(state: AgentState) -> AgentState:
-    """Execute the selected tool with the provided input."""
-    tool_name = state["current_tool"]
-    tool_input = state["tool_input"]
-    
-    # Check if the tool exists
-    if tool_name not in TOOLS:
-        state["tool_output"] = {
+        decision = _tool_decision(response)
+        if cache_key:
+            _RESPONSE_CACHE.set(cache_key, decision)
+    
+    reasoning = decision["content"]
+    
+    # Without further tool calls the plan is complete
+    if not decision["tool_calls"]:
+        if reasoning:
+            update.update(add_message_to_history("assistant", reasoning))
+        update["next_step"] = EdgeNames.GENERATE_OUTPUT
+        return update
+    
+    update["tool_calls"] = decision["tool_calls"]
+    
+    # Add to chat history
+    message = "\n\n".join(
+        f"I'll use the {call['tool']} tool with these parameters: {_dumps(call['tool_input'])}"
+        for call in update["tool_calls"]
+    )
+    if reasoning:
+        message += f"\n\nReasoning: {reasoning}"
+    update.update(add_message_to_history("assistant", message))
+    update["next_step"] = EdgeNames.EXECUTE_TOOL
+    
+    return update
+
+def _run_tool(tool_name: str, tool_input: Dict[str, Any], debug: bool = False) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Run a single tool call, returning its output and an error record if it failed."""
+    # Get the tool, checking that it exists
+    dispatch = _tool_dispatch().get(tool_name)
+    if dispatch is None:
+        return {
             "success": False,
-            "error": f"Tool '{tool_name}' is not available. Available tools are: {', '.join(TOOLS.keys())}"
-        }
-        return state
-    
-    # Get the tool
-    tool = TOOLS[tool_name]
+            "error": f"Tool '{tool_name}' is not available. Available tools are: {', '.join(_tools().keys())}"
+        }, None
+    func, args_schema = dispatch
     
     try:
-        # Execute the tool
-        tool_output = tool(**tool_input)
-        state["tool_output"] = tool_output
+        # Validate the arguments against the tool's schema, then execute the tool
+        args = args_schema.parse_obj(tool_input)
+        return func(**{key: getattr(args, key) for key in args.__fields_set__}), None
         
     except Exception as e:
-        # If there's an error executing the tool, capture it
-        error_msg = f"Error executing {tool_name}: {str(e)}\n{traceback.format_exc()}"
-        state["tool_output"] = {
+        # If there's an error executing the tool, capture it; the traceback is
+        # only formatted in debug mode, once, and to a bounded depth
+        tb = "".join(traceback.format_exception(type(e), e, e.__traceback__, limit=10)) if debug else None
+        error_msg = f"Error executing {tool_name}: {type(e).__name__}: {e}"
+        if tb:
+            error_msg += f"\n{tb}"
+        return {
             "success": False,
             "error": error_msg
-        }
-        
-        # Add to errors list
-        state["errors"].append({
+        }, {
             "type": "tool_execution_error",
             "tool": tool_name,
             "input": tool_input,
             "message": str(e),
-            "traceback": traceback.format_exc()
-        })
-    
-    return state
+            "traceback": tb
+        }
 
-def process_tool_output(state: AgentState) -> Union[Tuple[str, AgentState], AgentState]:
-    """Process the output from the tool and decide next steps."""
-    llm = get_langchain_openai_client()
-    
-    prompt = ChatPromptTemplate.from_messages([
-        SystemMessage(content=SYSTEM_PROMPT),
-        MessagesPlaceholder(variable_name="chat_history"),
-        HumanMessage(content=TOOL_PROCESSING_PROMPT.format(
-            current_tool=state["current_tool"],
-            tool_input=state["tool_input"],
-            tool_output=state["tool_output"],
-            plan=state["plan"],
-            chat_history=state["chat_history"]
-        ))
-    ])
-    
-    chain = prompt | llm
-    
-    response = chain.invoke({"chat_history": state["chat_history"]})
-    
-    # Extract the JSON from the response
-    response_text = response.content
-    
-    try:
-        # Extract JSON object if it's wrapped in ```json ... ```
-        if "```json" in response_text and "```" in response_text.split("```json", 1)[1]:
-            json_str = response_text.split("```json", 1)[1].split("```", 1)[0]
-            decision = json.loads(json_str)
-        else:
-            # Try to parse the entire response as JSON
-            decision = json.loads(response_text)
-        
-        # Update the state based on the decision
-        if "updated_plan" in decision:
-            state["plan"] = decision["updated_plan"]
-        
-        # Add the reasoning to chat history
-        tool_result = "success" if state["tool_output"].get("success", False) else "failure"
-        message = f"Tool {state['current_tool']} execution result: {tool_result}\n\n"
-        
-        if state["tool_output"].get("success", False):
-            # Format successful output nicely
-            output_str = str(state["tool_output"])
-            if len(output_str) > 500:
-                output_str = output_str[:250] + "\n...\n" + output_str[-250:]
-            message += f"Output: {output_str}\n\n"
-        else:
-            # Format error nicely
-            error = state["tool_output"].get("error", "Unknown error")
-            message += f"Error: {error}\n\n"
+def execute_tool(state: AgentState) -> StateUpdate:
+    """Execute the selected tool calls in parallel with the provided inputs."""
+    tool_calls = state.tool_calls or []
+    
+    # Start the disk reads for a batch of files together so they overlap in the kernel
+    file_paths = [
+        call["tool_input"]["file_path"]
+        for call in tool_calls
+        if call["tool"] in _FILE_READ_TOOLS and isinstance(call["tool_input"].get("file_path"), str)
+    ]
+    if len(file_paths) >= 2:
+        from tools.file_operations import prefetch_files
+        prefetch_files(file_paths)
+    
+    # Fan the calls out so independent I/O-bound tools overlap their waits
+    futures = {
+        _TOOL_EXECUTOR.submit(_run_tool, call["tool"], call["tool_input"], state.debug): call["id"]
+        for call in tool_calls
+    }
+    results = {}
+    for future in as_completed(futures):
+        results[futures[future]] = future.result()
+    
+    # Collect the results in the original call order
+    tool_output = {}
+    errors = []
+    for call in tool_calls:
+        output, error = results[call["id"]]
+        tool_output[call["id"]] = output
         
-        message += f"Reasoning: {decision.get('reasoning', '')}"
-        state = add_message_to_history(state, "assistant", message)
-        
-        # Return the appropriate next state based on the decision
-        decision_type = decision.get("decision", "").lower()
-        
-        if decision_type == "report_error":
-            # We need to handle an error
-            return EdgeNames.ERROR, state
-        elif decision_type == "generate_output":
-            # We're done and need to generate the final output
-            return EdgeNames.GENERATE_OUTPUT, state
-        else:
-            # Continue with the plan (default)
-            return EdgeNames.CHOOSE_TOOL, state
-        
-    except (json.JSONDecodeError, KeyError) as e:
-        # If there's an error parsing the JSON, add it to the errors list
-        state["errors"].append({
-            "type": "json_parse_error",
-            "message": str(e),
-            "response": response_text
-        })
+        # Add to errors list
+        if error:
+            errors.append(error)
         
-        # If we can't parse the response, assume we need to continue with the plan
-        return EdgeNames.CHOOSE_TOOL, state
+        # A finishing tool ends the batch, so later results are discarded
+        if isinstance(output, dict) and output.get("finish"):
+            break
+    
+    update: StateUpdate = {"tool_output": tool_output, "errors": errors}
+    update.update(add_message_to_history("assistant", _format_tool_results(tool_calls, tool_output)))
+    
+    # An error fix proposed by handle_error is cached once its calls have worked
+    context = state.context
+    if "pending_error_fix" in context:
+        succeeded = not errors and all(
+            isinstance(output, dict) and output.get("success", False) for output in tool_output.values()
+        )
+        if succeeded:
+            _RESPONSE_CACHE.set(*context["pending_error_fix"])
+        update["context"] = {key: value for key, value in context.items() if key != "pending_error_fix"}
+    
+    # Tool exceptions go to error handling; failures the tools reported go back to the LLM to adapt
+    update["next_step"] = EdgeNames.ERROR if errors else EdgeNames.REASON
+    
+    return update
 
-def handle_error(state: AgentState) -> Union[Tuple[str, AgentState], AgentState]:
+async def handle_error(state: AgentState) -> StateUpdate:
     """Handle errors that occur during tool execution."""
     # Increment the error fix attempts counter
-    state["error_fix_attempts"] += 1
+    error_fix_attempts = state.error_fix_attempts + 1
+    update: StateUpdate = {"error_fix_attempts": error_fix_attempts}
     
     # If we've tried to fix the error too many times, generate the final output
-    if state["error_fix_attempts"] > 3:
+    if error_fix_attempts > 3:
         error_message = "I've made several attempts to resolve the issues but ran into persistent errors. Let me provide you with the current results and some suggestions for how to proceed."
-        state = add_message_to_history(state, "assistant", error_message)
-        return EdgeNames.GENERATE_OUTPUT, state
+        update.update(add_message_to_history("assistant", error_message))
+        update["next_step"] = EdgeNames.GENERATE_OUTPUT
+        return update
+    
+    # Identical failures of the same calls get the fix that was proposed before
+    tool_errors = {
+        call_id: output.get("error")
+        for call_id, output in (state.tool_output or {}).items()
+        if not output.get("success", False)
+    }
+    cache_key = _response_cache_key(
+        state, NodeNames.HANDLE_ERROR, _fingerprint(state.tool_calls), _fingerprint(tool_errors)
+    )
+    solution = _RESPONSE_CACHE.get(cache_key) if cache_key else None
+    
+    if solution is None:
+        response = await _chain(NodeNames.HANDLE_ERROR).ainvoke({
+            "chat_history": await _history_for_prompt(state, update),
+            "tool_calls": state.tool_calls,
+            "tool_output": _summarize_tool_output(state.tool_output),
+            "plan": state.plan,
+            "errors": state.errors,
+            "error_fix_attempts": error_fix_attempts
+        })
+        _log_cache_usage(NodeNames.HANDLE_ERROR.value, response)
+        
+        solution = _tool_decision(response)
+        
+        # Only cached once the retried calls succeed, so a bad fix isn't replayed
+        if cache_key and solution["tool_calls"]:
+            update["context"] = {**update.get("context", state.context), "pending_error_fix": (cache_key, solution)}
     
-    llm = get_langchain_openai_client()
+    # Without corrected tool calls the error can't be fixed, so generate the final output
+    if not solution["tool_calls"]:
+        message = f"I encountered an error I couldn't fix:\n\n{solution['content']}"
+        update.update(add_message_to_history("assistant", message))
+        update["next_step"] = EdgeNames.GENERATE_OUTPUT
+        return update
     
-    prompt = ChatPromptTemplate.from_messages([
-        SystemMessage(content=SYSTEM_PROMPT),
-        MessagesPlaceholder(variable_name="chat_history"),
-        HumanMessage(content=ERROR_HANDLING_PROMPT.format(
-            current_tool=state["current_tool"],
-            tool_input=state["tool_input"],
-            tool_output=state["tool_output"],
-            plan=state["plan"],
-            chat_history=state["chat_history"],
-            errors=state["errors"],
-            error_fix_attempts=state["error_fix_attempts"]
-        ))
-    ])
-    
-    chain = prompt | llm
+    # Update the state based on the solution
+    update["tool_calls"] = solution["tool_calls"]
     
-    response = chain.invoke({"chat_history": state["chat_history"]})
+    # Add the analysis and solution to chat history
+    message = f"I encountered an error. Here's how I'll fix it:\n\n{solution['content']}\n\n"
+    tool_names = ", ".join(call["tool"] for call in update["tool_calls"])
+    message += f"I'll retry with the {tool_names} tool(s) using updated parameters."
+    update.update(add_message_to_history("assistant", message))
     
-    # Extract the JSON from the response
-    response_text = response.content
+    # Retry executing the tool
+    update["next_step"] = EdgeNames.EXECUTE_TOOL
     
-    try:
-        # Extract JSON object if it's wrapped in ```json ... ```
-        if "```json" in response_text and "```" in response_text.split("```json", 1)[1]:
-            json_str = response_text.split("```json", 1)[1].split("```", 1)[0]
-            error_solution = json.loads(json_str)
-        else:
-            # Try to parse the entire response as JSON
-            error_solution = json.loads(response_text)
-        
-        # Update the state based on the solution
-        state["current_tool"] = error_solution["updated_tool"]
-        state["tool_input"] = error_solution["updated_tool_input"]
-        
-        # Add the analysis and solution to chat history
-        message = f"I encountered an error. Here's how I'll fix it:\n\n"
-        message += f"Error analysis: {error_solution.get('error_analysis', '')}\n\n"
-        message += f"Solution: {error_solution.get('solution', '')}\n\n"
-        message += f"I'll retry with the {state['current_tool']} tool using updated parameters."
-        
-        state = add_message_to_history(state, "assistant", message)
-        
-        # Retry executing the tool
-        return EdgeNames.EXECUTE_TOOL, state
-        
-    except (json.JSONDecodeError, KeyError) as e:
-        # If there's an error parsing the JSON, add it to the errors list
-        state["errors"].append({
-            "type": "json_parse_error",
-            "message": str(e),
-            "response": response_text
-        })
-        
-        # If we can't parse the response, generate the final output
-        return EdgeNames.GENERATE_OUTPUT, state
+    return update
 
-def generate_final_output(state: AgentState) -> AgentState:
+async def generate_final_output(state: AgentState) -> StateUpdate:
     """Generate the final output to present to the user."""
-    llm = get_langchain_openai_client()
-    
-    prompt = ChatPromptTemplate.from_messages([
-        SystemMessage(content=SYSTEM_PROMPT),
-        MessagesPlaceholder(variable_name="chat_history"),
-        HumanMessage(content=FINAL_OUTPUT_PROMPT.format(
-            input=state["input"],
-            plan=state["plan"],
-            chat_history=state["chat_history"]
-        ))
-    ])
-    
-    chain = prompt | llm
-    
-    response = chain.invoke({"chat_history": state["chat_history"]})
+    update: StateUpdate = {}
+    response = await _stream(NodeNames.GENERATE_FINAL_OUTPUT, {
+        "chat_history": await _history_for_prompt(state, update),
+        "input": state.input,
+        "plan": state.plan
+    })
+    _log_cache_usage(NodeNames.GENERATE_FINAL_OUTPUT.value, response)
     
     # Extract the final output from the response
     final_output = response.content
     
+    # A plan that led to errors shouldn't be offered to later requests
+    plan_cache_key = state.context.get("plan_cache_key")
+    if state.errors and plan_cache_key and _plan_cache():
+        _plan_cache()[1].pop(plan_cache_key)
+    
     # Update the state
-    state["final_output"] = final_output
-    state = add_message_to_history(state, "assistant", final_output)
+    update["final_output"] = final_output
+    update.update(add_message_to_history("assistant", final_output))
     
-    return state
+    return update
 
-def start(state: AgentState) -> AgentState:
+def start(state: AgentState) -> StateUpdate:
     """Starting node that adds the user's request to chat history."""
-    state = add_message_to_history(state, "user", state["input"])
-    return state
-
-def get_agent_executor() -> Dict[str, Callable]:
+    return add_message_to_history("user", state.input)
+
+# Node functions keyed by node name, built once and shared read-only
+_AGENT_EXECUTOR: Mapping[str, Callable] = MappingProxyType({
+    NodeNames.START: start,
+    NodeNames.PLAN: plan,
+    NodeNames.REASON_AND_ACT: reason_and_act,
+    NodeNames.EXECUTE_TOOL: execute_tool,
+    NodeNames.HANDLE_ERROR: handle_error,
+    NodeNames.GENERATE_FINAL_OUTPUT: generate_final_output,
+})
+
+def get_agent_executor() -> Mapping[str, Callable]:
     """Get all the functions needed for the agent executor."""
-    return {
-        NodeNames.START: start,
-        NodeNames.PLAN: plan,
-        NodeNames.CHOOSE_TOOL: choose_tool,
-        NodeNames.EXECUTE_TOOL: execute_tool,
-        NodeNames.PROCESS_TOOL_OUTPUT: process_tool_output,
-        NodeNames.HANDLE_ERROR: handle_error,
-        NodeNames.GENERATE_FINAL_OUTPUT: generate_final_output,
-    }
\ No newline at end of file
+    return _AGENT_EXECUTOR
\ No newline at end of file
@@ -1,10 +1,16 @@
 from typing import Dict, List, Any, Optional, Tuple, Union, Annotated, TypedDict
+import threading
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 
 from .state import AgentState, NodeNames, EdgeNames, create_initial_state
 from .agent import get_agent_executor
 
+# Compiled graph shared by every caller; compiling validates the graph and
+# builds its channels, so it is done once per process
+_COMPILED = None
+_COMPILED_LOCK = threading.Lock()
+
 def create_agent_graph() -> StateGraph:
     """Create the LangGraph workflow for the agent."""
     # Create a new graph
@@ -16,32 +22,37 @@ def create_agent_graph() -> StateGraph:
     # Add nodes to the graph
     graph.add_node(NodeNames.START, agent_executor[NodeNames.START])
     graph.add_node(NodeNames.PLAN, agent_executor[NodeNames.PLAN])
-    graph.add_node(NodeNames.CHOOSE_TOOL, agent_executor[NodeNames.CHOOSE_TOOL])
+    graph.add_node(NodeNames.REASON_AND_ACT, agent_executor[NodeNames.REASON_AND_ACT])
     graph.add_node(NodeNames.EXECUTE_TOOL, agent_executor[NodeNames.EXECUTE_TOOL])
-    graph.add_node(NodeNames.PROCESS_TOOL_OUTPUT, agent_executor[NodeNames.PROCESS_TOOL_OUTPUT])
     graph.add_node(NodeNames.HANDLE_ERROR, agent_executor[NodeNames.HANDLE_ERROR])
     graph.add_node(NodeNames.GENERATE_FINAL_OUTPUT, agent_executor[NodeNames.GENERATE_FINAL_OUTPUT])
     
     # Define edges between nodes
     graph.add_edge(NodeNames.START, NodeNames.PLAN)
-    graph.add_edge(NodeNames.PLAN, NodeNames.CHOOSE_TOOL)
-    graph.add_edge(NodeNames.CHOOSE_TOOL, NodeNames.EXECUTE_TOOL)
-    graph.add_edge(NodeNames.EXECUTE_TOOL, NodeNames.PROCESS_TOOL_OUTPUT)
+    graph.add_edge(NodeNames.PLAN, NodeNames.REASON_AND_ACT)
     
     # Add conditional edges
     graph.add_conditional_edges(
-        NodeNames.PROCESS_TOOL_OUTPUT,
-        lambda state: state[0] if isinstance(state, tuple) else EdgeNames.CHOOSE_TOOL,
+        NodeNames.REASON_AND_ACT,
+        lambda state: state.next_step or EdgeNames.GENERATE_OUTPUT,
         {
-            EdgeNames.CHOOSE_TOOL: NodeNames.CHOOSE_TOOL,
-            EdgeNames.ERROR: NodeNames.HANDLE_ERROR,
+            EdgeNames.EXECUTE_TOOL: NodeNames.EXECUTE_TOOL,
             EdgeNames.GENERATE_OUTPUT: NodeNames.GENERATE_FINAL_OUTPUT,
         }
     )
     
+    graph.add_conditional_edges(
+        NodeNames.EXECUTE_TOOL,
+        lambda state: state.next_step or EdgeNames.REASON,
+        {
+            EdgeNames.REASON: NodeNames.REASON_AND_ACT,
+            EdgeNames.ERROR: NodeNames.HANDLE_ERROR,
+        }
+    )
+    
     graph.add_conditional_edges(
         NodeNames.HANDLE_ERROR,
-        lambda state: state[0] if isinstance(state, tuple) else EdgeNames.EXECUTE_TOOL,
+        lambda state: state.next_step or EdgeNames.EXECUTE_TOOL,
         {
             EdgeNames.EXECUTE_TOOL: NodeNames.EXECUTE_TOOL,
             EdgeNames.GENERATE_OUTPUT: NodeNames.GENERATE_FINAL_OUTPUT,
@@ -57,9 +68,11 @@ def create_agent_graph() -> StateGraph:
     return graph
 
 def build_runnable_agent():
-    """Build a runnable agent from the graph."""
-    # Create the graph
-    graph = create_agent_graph()
-    
-    # Compile the graph
-    return graph.compile()
\ No newline at end of file
+    """Build a runnable agent from the graph, compiling it on first use."""
+    global _COMPILED
+    if _COMPILED is None:
+        with _COMPILED_LOCK:
+            if _COMPILED is None:
+                # Create and compile the graph
+                _COMPILED = create_agent_graph().compile()
+    return _COMPILED
\ No newline at end of file
@@ -1,39 +1,83 @@
-from typing import Dict, List, Any, Optional, Tuple, TypedDict, Annotated
+from typing import Dict, List, Any, Optional, Tuple, Iterator, Annotated, Sequence
+from dataclasses import dataclass, field, replace
 from enum import Enum
-import json
+import operator
+import orjson
+from pyrsistent import PVector, pvector
 
-class AgentState(TypedDict):
+# Partial state returned by a node, merged into AgentState by LangGraph
+StateUpdate = Dict[str, Any]
+
+def append_messages(history: Sequence[Dict[str, str]], messages: Sequence[Dict[str, str]]) -> PVector:
+    """Reducer for chat history: append new messages to a persistent vector.
+    
+    Appending shares structure with the previous history instead of copying it,
+    so long runs don't reallocate the whole history on every step.
+    """
+    if not isinstance(history, PVector):
+        history = pvector(history)
+    return history.extend(messages)
+
+@dataclass(slots=True)
+class AgentState:
     """State for the agent."""
     # Input
-    input: str
-    # History of the conversation so far
-    chat_history: List[Dict[str, str]]
+    input: str = ""
+    # History of the conversation so far; nodes return only new messages, which are appended
+    chat_history: Annotated[Sequence[Dict[str, str]], append_messages] = field(default_factory=pvector)
     # Current plan for addressing the task
-    plan: Optional[List[str]]
-    # Current tool being used
-    current_tool: Optional[str]
-    # Input for current tool
-    tool_input: Optional[Dict[str, Any]]
-    # Output from current tool
-    tool_output: Optional[Dict[str, Any]]
-    # List of errors encountered
-    errors: List[Dict[str, Any]]
+    plan: Optional[List[str]] = None
+    # Batch of tool calls to execute, each with an id, tool name and tool input
+    tool_calls: Optional[List[Dict[str, Any]]] = None
+    # Output from each tool call, keyed by call id
+    tool_output: Optional[Dict[str, Any]] = None
+    # List of errors encountered; nodes return only new errors, which are appended
+    errors: Annotated[List[Dict[str, Any]], operator.add] = field(default_factory=list)
     # Attempt to fix the current error
-    error_fix_attempts: int
+    error_fix_attempts: int = 0
     # Final output to show to the user
-    final_output: Optional[str]
+    final_output: Optional[str] = None
     # Additional context the agent might need
-    context: Dict[str, Any]
+    context: Dict[str, Any] = field(default_factory=dict)
     # Flag to indicate debugging mode
-    debug: bool
+    debug: bool = False
+    # Edge to follow after a node that branches
+    next_step: Optional[str] = None
+    
+    # Nodes and edges read fields as attributes; dict-style access remains so code
+    # that also handles the plain dicts of channel values LangGraph streams works on this
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.__slots__ else default
+    
+    def keys(self) -> Tuple[str, ...]:
+        return self.__slots__
+    
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return ((key, getattr(self, key)) for key in self.__slots__)
+    
+    def copy(self) -> "AgentState":
+        return replace(self)
 
 class NodeNames(str, Enum):
     """Node names for the graph."""
     START = "start"
     PLAN = "plan"
-    CHOOSE_TOOL = "choose_tool"
+    REASON_AND_ACT = "reason_and_act"
     EXECUTE_TOOL = "execute_tool"
-    PROCESS_TOOL_OUTPUT = "process_tool_output"
     HANDLE_ERROR = "handle_error"
     GENERATE_FINAL_OUTPUT = "generate_final_output"
     END = "end"
@@ -41,9 +85,8 @@ class NodeNames(str, Enum):
 class EdgeNames(str, Enum):
     """Edge names for the graph."""
     PLAN = "plan"
-    CHOOSE_TOOL = "choose_tool"
+    REASON = "reason"
     EXECUTE_TOOL = "execute_tool"
-    PROCESS_OUTPUT = "process_output"
     ERROR = "error"
     RETRY = "retry"
     GENERATE_OUTPUT = "generate_output"
@@ -51,24 +94,11 @@ class EdgeNames(str, Enum):
     
 def create_initial_state() -> AgentState:
     """Create an initial state for the agent."""
-    return {
-        "input": "",
-        "chat_history": [],
-        "plan": None,
-        "current_tool": None,
-        "tool_input": None,
-        "tool_output": None,
-        "errors": [],
-        "error_fix_attempts": 0,
-        "final_output": None,
-        "context": {},
-        "debug": False
-    }
+    return AgentState()
 
-def add_message_to_history(state: AgentState, role: str, content: str) -> AgentState:
-    """Add a message to the chat history."""
-    state["chat_history"].append({"role": role, "content": content})
-    return state
+def add_message_to_history(role: str, content: str) -> StateUpdate:
+    """Build the state update that appends a message to the chat history."""
+    return {"chat_history": [{"role": role, "content": content}]}
 
 def pretty_print_state(state: AgentState) -> None:
     """Pretty print the state for debugging."""
@@ -80,10 +110,10 @@ def pretty_print_state(state: AgentState) -> None:
         state_copy["chat_history"] = f"[{len(state_copy['chat_history'])} messages]"
     
     # Format tool input/output for better readability
-    for key in ["tool_input", "tool_output", "context"]:
+    for key in ["tool_calls", "tool_output", "context"]:
         if key in state_copy and state_copy[key]:
             try:
-                state_copy[key] = json.dumps(state_copy[key], indent=2)
+                state_copy[key] = orjson.dumps(state_copy[key], option=orjson.OPT_INDENT_2).decode()
             except:
                 pass
     
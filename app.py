@@ -1,17 +1,107 @@
 import os
+import re
+import asyncio
+import threading
+import time
 import streamlit as st
 import pandas as pd
 import json
+import uuid
+import glob
+import contextlib
+from collections import deque
 from typing import Dict, List, Any, Optional
 from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+from pyrsistent import PVector
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # Import agent components
 from agent.graph import build_runnable_agent
-from agent.state import create_initial_state, pretty_print_state
+from agent.agent import reset_clients
+from agent.state import create_initial_state, pretty_print_state, NodeNames
 
 # Load environment variables
 load_dotenv()
 
+# Tool named in the agent's "I'll use the <tool> tool ..." messages
+_TOOL_RE = re.compile(r"I'll use the (\S+)")
+
+# Debug trace files older than this many seconds are deleted when a new session starts
+TRACE_MAX_AGE = 24 * 60 * 60
+
+def prune_trace_files():
+    """Delete debug trace files left behind by sessions that ended long ago"""
+    cutoff = time.time() - TRACE_MAX_AGE
+    for path in glob.glob(os.path.join("temp", "trace_*.jsonl")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+# Minimum seconds between updates of the same element while the agent runs;
+# each update is a round trip to the browser
+UI_UPDATE_INTERVAL = 0.25
+
+class StreamingMessageHandler(BaseCallbackHandler):
+    """Render the plan and final answer into a placeholder token by token as the LLM streams them"""
+    
+    def __init__(self, placeholder, tags):
+        self.placeholder = placeholder
+        self.tags = set(tags)
+        self.text = ""
+        self.run_ids = set()
+        self.last_render = 0.0
+        # Graph nodes run in worker threads, which need the script context to update the page
+        self.script_ctx = get_script_run_ctx()
+    
+    def on_chat_model_start(self, serialized, messages, *, run_id, tags=None, **kwargs):
+        if self.tags.intersection(tags or ()):
+            self.run_ids.add(run_id)
+            self.text = ""
+    
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        if run_id in self.run_ids:
+            add_script_run_ctx(threading.current_thread(), self.script_ctx)
+            self.text += token
+            if time.monotonic() - self.last_render >= UI_UPDATE_INTERVAL:
+                self.placeholder.markdown(self.text)
+                self.last_render = time.monotonic()
+    
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        # Show the tokens that arrived since the last throttled update
+        if run_id in self.run_ids:
+            add_script_run_ctx(threading.current_thread(), self.script_ctx)
+            self.placeholder.markdown(self.text)
+
+def json_default(value):
+    """Serialize the persistent chat history as a list and anything else as a string"""
+    return list(value) if isinstance(value, PVector) else str(value)
+
+@st.cache_data(show_spinner=False)
+def _load_df(path: str, mtime: float, size: int) -> pd.DataFrame:
+    """Parse an uploaded CSV or Excel file; mtime and size key the cache so a replaced file is parsed again"""
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    return pd.read_excel(path)
+
+@st.cache_resource
+def _event_loop() -> asyncio.AbstractEventLoop:
+    """Event loop every agent run is scheduled on, running in its own thread for the life of the process.
+    
+    The pooled async HTTP clients are bound to the loop their connections were opened on,
+    so runs must not each start a fresh loop with asyncio.run
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="agent-event-loop", daemon=True).start()
+    return loop
+
+@st.cache_resource
+def _get_agent():
+    """Compiled agent graph, built once per process and shared by every session"""
+    return build_runnable_agent()
+
 # Set page configuration
 st.set_page_config(
     page_title="LangGraph Agent Framework",
@@ -75,21 +165,41 @@ if st.sidebar.button("Save Configuration"):
     os.environ["AZURE_SEARCH_SERVICE"] = azure_search_service
     os.environ["AZURE_SEARCH_KEY"] = azure_search_key
     os.environ["AZURE_SEARCH_INDEX"] = azure_search_index
+    # Rebuild the agent and its clients with the new configuration
+    reset_clients()
+    _get_agent.clear()
     st.sidebar.success("Configuration saved!")
 
 # Add debug toggle
 debug_mode = st.sidebar.checkbox("Debug Mode", value=False)
 
-# File upload widget
-uploaded_file = st.sidebar.file_uploader("Upload a file", type=["csv", "xlsx", "txt", "json"])
+# File upload widget; uploads are saved in chunks of this many bytes
+UPLOAD_CHUNK_SIZE = 1 << 20
+uploaded_file = st.sidebar.file_uploader("Upload a file", type=["csv", "xlsx", "txt", "json", "jsonl"])
 
 if uploaded_file is not None:
     # Save the uploaded file to a temporary location
     file_path = os.path.join("temp", uploaded_file.name)
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
     
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
+    # Only write a newly uploaded file, so reruns keep its mtime and the cached parse.
+    # Every upload gets its own file_id, even one with the same name and size
+    if st.session_state.get("upload_file_id") != uploaded_file.file_id or not os.path.exists(file_path):
+        # Drop cached parses of earlier uploads to bound memory
+        _load_df.clear()
+        with open(file_path, "wb", buffering=UPLOAD_CHUNK_SIZE) as f:
+            if hasattr(uploaded_file, "readinto"):
+                # Copy through one reusable buffer rather than a view of the whole upload
+                buf = bytearray(UPLOAD_CHUNK_SIZE)
+                uploaded_file.seek(0)
+                while True:
+                    n = uploaded_file.readinto(buf)
+                    if not n:
+                        break
+                    f.write(memoryview(buf)[:n])
+            else:
+                f.write(uploaded_file.getbuffer())
+        st.session_state.upload_file_id = uploaded_file.file_id
     
     st.sidebar.success(f"File saved to {file_path}")
     
@@ -103,10 +213,7 @@ if uploaded_file is not None:
     # Try to display preview for certain file types
     if uploaded_file.name.endswith((".csv", ".xlsx")):
         try:
-            if uploaded_file.name.endswith(".csv"):
-                df = pd.read_csv(uploaded_file)
-            else:
-                df = pd.read_excel(uploaded_file)
+            df = _load_df(file_path, os.path.getmtime(file_path), uploaded_file.size)
             
             st.sidebar.markdown("#### File Preview")
             st.sidebar.dataframe(df.head(5), use_container_width=True)
@@ -134,8 +241,23 @@ This is an agentic framework built with LangGraph and Streamlit. It can:
 # Initialize session state for chat history
 if "messages" not in st.session_state:
     st.session_state.messages = []
+    st.session_state.truncated_messages = 0
 
-# Display chat history
+# Number of most recent messages kept in the transcript and re-rendered on each rerun
+MAX_MESSAGES = 50
+
+def append_message(message):
+    """Add a message to the transcript, dropping the oldest beyond MAX_MESSAGES"""
+    st.session_state.messages.append(message)
+    dropped = len(st.session_state.messages) - MAX_MESSAGES
+    if dropped > 0:
+        st.session_state.messages = st.session_state.messages[dropped:]
+        st.session_state.truncated_messages += dropped
+
+# Display chat history. Streamlit drops any element a rerun doesn't emit again, so
+# every kept message is re-sent each run; MAX_MESSAGES is what bounds this work
+if st.session_state.truncated_messages:
+    st.caption(f"[{st.session_state.truncated_messages} earlier messages truncated]")
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
@@ -146,7 +268,7 @@ prompt = st.chat_input("Ask the agent to do something...")
 # When the user submits a message
 if prompt:
     # Add user message to chat history
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    append_message({"role": "user", "content": prompt})
     
     # Display user message
     with st.chat_message("user"):
@@ -162,38 +284,73 @@ if prompt:
         
         # Create initial agent state
         state = create_initial_state()
-        state["input"] = prompt
-        state["debug"] = debug_mode
+        state.input = prompt
+        state.debug = debug_mode
         
         # Build and run the agent
-        agent = build_runnable_agent()
+        agent = _get_agent()
         
         # Streamlit doesn't support real-time updates well, so we'll collect the intermediate states
-        intermediate_states = []
+        # Only the most recent states are kept; each event is a fresh dict, so it isn't copied
+        intermediate_states = deque(maxlen=5)
+        
+        # In debug mode every state is also appended to this session's JSON Lines trace
+        # file, which each run of the session overwrites
+        if "session_id" not in st.session_state:
+            st.session_state.session_id = uuid.uuid4().hex
+            prune_trace_files()
+        trace_path = os.path.join("temp", f"trace_{st.session_state.session_id}.jsonl")
+        if debug_mode:
+            os.makedirs(os.path.dirname(trace_path), exist_ok=True)
         
         def collect_intermediate_states(state):
-            intermediate_states.append(state.copy())
+            intermediate_states.append(state)
             return state
             
         # Create a progress indicator
         progress = st.progress(0)
         
-        # Run the agent with event streaming
-        for i, event in enumerate(agent.stream(state, {"recursion_limit": 20})):
-            # Update progress based on event count
-            progress.progress(min(i / 10, 1.0))
+        # Show the plan and final answer as they are generated
+        token_handler = StreamingMessageHandler(
+            message_placeholder, [NodeNames.PLAN.value, NodeNames.GENERATE_FINAL_OUTPUT.value]
+        )
+        config = {"recursion_limit": 20, "callbacks": [token_handler]}
+        
+        # Run the agent, streaming the full state after each step. It runs on the shared
+        # event loop thread, which needs this script's context to update the page
+        script_ctx = get_script_run_ctx()
+        
+        async def run_agent(trace_file):
+            i = 0
+            last_update = 0.0
+            async for event in agent.astream(state, config, stream_mode="values"):
+                i += 1
+                
+                # Store the event for debugging
+                collect_intermediate_states(event)
+                if trace_file:
+                    trace_file.write(json.dumps(event, default=json_default) + "\n")
+                
+                # Skip drawing events that arrive within the interval of the last
+                # update; the final answer is rendered after the run
+                if time.monotonic() - last_update < UI_UPDATE_INTERVAL:
+                    continue
+                last_update = time.monotonic()
+                add_script_run_ctx(threading.current_thread(), script_ctx)
+                
+                # Update progress based on event count
+                progress.progress(min(i / 10, 1.0))
             
-            # Store the event for debugging
-            if isinstance(event, dict) and "state" in event:
-                collect_intermediate_states(event["state"])
+                # Get the latest message from chat history
+                if "chat_history" in event:
+                    chat_history = event["chat_history"]
+                    if chat_history and len(chat_history) > 0:
+                        latest_message = chat_history[-1]
+                        if latest_message["role"] == "assistant":
+                            message_placeholder.markdown(latest_message["content"])
         
-            # Get the latest message from chat history
-            if isinstance(event, dict) and "state" in event and "chat_history" in event["state"]:
-                chat_history = event["state"]["chat_history"]
-                if chat_history and len(chat_history) > 0:
-                    latest_message = chat_history[-1]
-                    if latest_message["role"] == "assistant":
-                        message_placeholder.markdown(latest_message["content"])
+        with open(trace_path, "w") if debug_mode else contextlib.nullcontext() as trace_file:
+            asyncio.run_coroutine_threadsafe(run_agent(trace_file), _event_loop()).result()
         
         # Set progress to 100% when done
         progress.progress(1.0)
@@ -208,7 +365,7 @@ if prompt:
                 message_placeholder.markdown(final_message["content"])
                 # Add the assistant message to chat history
                 if len(st.session_state.messages) > 0 and st.session_state.messages[-1]["role"] != "assistant":
-                    st.session_state.messages.append(final_message)
+                    append_message(final_message)
         
         # Display debug information if enabled
         if debug_mode and final_state:
@@ -223,11 +380,13 @@ if prompt:
                 
                 # Show tools used
                 if "chat_history" in final_state:
-                    tool_executions = []
-                    for msg in final_state["chat_history"]:
-                        if msg["role"] == "assistant" and "I'll use the" in msg["content"]:
-                            tool_name = msg["content"].split("I'll use the")[1].split()[0] if "I'll use the" in msg["content"] else "Unknown"
-                            tool_executions.append(tool_name)
+                    # A message lists every call of a parallel batch, so collect all matches
+                    tool_executions = [
+                        tool_name
+                        for msg in final_state["chat_history"]
+                        if msg["role"] == "assistant"
+                        for tool_name in _TOOL_RE.findall(msg["content"])
+                    ]
                     
                     if tool_executions:
                         st.markdown("#### Tools Used")
@@ -250,14 +409,14 @@ if prompt:
                 
                 st.json(display_state)
                 
-                # Allow downloading the full trace
-                trace_data = json.dumps(intermediate_states, default=str)
-                st.download_button(
-                    label="Download Full Execution Trace",
-                    data=trace_data,
-                    file_name="agent_execution_trace.json",
-                    mime="application/json"
-                )
+                # Allow downloading the full trace written during the run
+                with open(trace_path, "rb") as trace_data:
+                    st.download_button(
+                        label="Download Full Execution Trace",
+                        data=trace_data,
+                        file_name="agent_execution_trace.jsonl",
+                        mime="application/x-ndjson"
+                    )
 
 # Add some examples at the bottom
 with st.expander("Example Prompts", expanded=False):
@@ -272,7 +431,7 @@ with st.expander("Example Prompts", expanded=False):
     for example in examples:
         if st.button(example):
             # Add to chat history and submit as if the user typed it
-            st.session_state.messages.append({"role": "user", "content": example})
+            append_message({"role": "user", "content": example})
             st.experimental_rerun()
 
 # Show a footer
@@ -0,0 +1,50 @@
+import pytest
+
+from utils import cache
+from utils.cache import TTLCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace the cache's monotonic clock with one the test advances by hand"""
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+def test_get_returns_stored_value():
+    ttl_cache = TTLCache()
+    ttl_cache.set(("plan", "input"), "value")
+    assert ttl_cache.get(("plan", "input")) == "value"
+
+def test_get_returns_default_for_missing_key():
+    assert TTLCache().get("missing", "default") == "default"
+
+def test_entry_expires_after_ttl(clock):
+    ttl_cache = TTLCache(ttl=10)
+    ttl_cache.set("key", "value")
+    clock[0] += 9
+    assert ttl_cache.get("key") == "value"
+    clock[0] += 2
+    assert ttl_cache.get("key") is None
+    # The expired entry is dropped, not just hidden
+    assert "key" not in ttl_cache._entries
+
+def test_least_recently_used_entry_is_evicted():
+    ttl_cache = TTLCache(maxsize=2)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    ttl_cache.get("a")
+    ttl_cache.set("c", 3)
+    assert ttl_cache.get("a") == 1
+    assert ttl_cache.get("b") is None
+    assert ttl_cache.get("c") == 3
+
+def test_pop_and_clear_remove_entries():
+    ttl_cache = TTLCache()
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    ttl_cache.pop("a")
+    ttl_cache.pop("missing")
+    assert ttl_cache.get("a") is None
+    assert ttl_cache.get("b") == 2
+    ttl_cache.clear()
+    assert ttl_cache.get("b") is None
@@ -0,0 +1,15 @@
+import importlib
+
+import pytest
+
+# Tool modules are imported together when the agent binds its tools, so an
+# error at import time in any one of them breaks every tool call
+TOOL_MODULES = ["tools.code_execution", "tools.file_operations", "tools.azure_tools"]
+
+@pytest.mark.parametrize("module_name", TOOL_MODULES)
+def test_tool_module_imports(module_name):
+    pytest.importorskip("langchain_core")
+    pytest.importorskip("pandas")
+    if module_name == "tools.azure_tools":
+        pytest.importorskip("azure.search.documents")
+    importlib.import_module(module_name)
@@ -0,0 +1,77 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("orjson")
+
+from utils.semantic_cache import SemanticCache
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "plan_cache.npz")
+
+def test_lookup_returns_entry_at_or_above_threshold(cache_path):
+    semantic_cache = SemanticCache(cache_path, threshold=0.9)
+    semantic_cache.set("summarize sales.csv", [1.0, 0.0, 0.0], ["step 1", "step 2"])
+    # Scale doesn't matter, only direction
+    assert semantic_cache.lookup([2.0, 0.1, 0.0]) == ("summarize sales.csv", ["step 1", "step 2"])
+
+def test_lookup_misses_below_threshold(cache_path):
+    semantic_cache = SemanticCache(cache_path, threshold=0.9)
+    semantic_cache.set("summarize sales.csv", [1.0, 0.0, 0.0], "plan")
+    assert semantic_cache.lookup([1.0, 1.0, 0.0]) is None
+    assert semantic_cache.lookup([0.0, 1.0, 0.0]) is None
+
+def test_lookup_on_empty_cache_misses(cache_path):
+    assert SemanticCache(cache_path).lookup([1.0, 0.0]) is None
+
+def test_entries_persist_across_instances(cache_path):
+    SemanticCache(cache_path).set("a", [1.0, 0.0], {"plan": ["x"]})
+    reloaded = SemanticCache(cache_path)
+    assert reloaded.lookup([1.0, 0.0]) == ("a", {"plan": ["x"]})
+
+def test_pop_is_persisted(cache_path):
+    semantic_cache = SemanticCache(cache_path)
+    semantic_cache.set("a", [1.0, 0.0], "plan a")
+    semantic_cache.set("b", [0.0, 1.0], "plan b")
+    semantic_cache.pop("a")
+    semantic_cache.pop("missing")
+    reloaded = SemanticCache(cache_path)
+    assert reloaded.lookup([1.0, 0.0]) is None
+    assert reloaded.lookup([0.0, 1.0]) == ("b", "plan b")
+
+def test_set_replaces_entry_for_same_key(cache_path):
+    semantic_cache = SemanticCache(cache_path)
+    semantic_cache.set("a", [1.0, 0.0], "old")
+    semantic_cache.set("a", [0.0, 1.0], "new")
+    assert semantic_cache.lookup([1.0, 0.0]) is None
+    assert semantic_cache.lookup([0.0, 1.0]) == ("a", "new")
+
+def test_oldest_entry_is_evicted_when_full(cache_path):
+    semantic_cache = SemanticCache(cache_path, maxsize=2)
+    semantic_cache.set("a", [1.0, 0.0, 0.0], "plan a")
+    semantic_cache.set("b", [0.0, 1.0, 0.0], "plan b")
+    semantic_cache.set("c", [0.0, 0.0, 1.0], "plan c")
+    assert semantic_cache.lookup([1.0, 0.0, 0.0]) is None
+    assert semantic_cache.lookup([0.0, 0.0, 1.0]) == ("c", "plan c")
+
+def test_new_embedding_dimension_resets_entries(cache_path):
+    semantic_cache = SemanticCache(cache_path)
+    semantic_cache.set("a", [1.0, 0.0], "plan a")
+    # A query from a different embedding model can't match the stored entries
+    assert semantic_cache.lookup([1.0, 0.0, 0.0]) is None
+    semantic_cache.set("b", [0.0, 0.0, 1.0], "plan b")
+    assert semantic_cache.lookup([0.0, 0.0, 1.0]) == ("b", "plan b")
+    assert SemanticCache(cache_path).lookup([1.0, 0.0]) is None
+
+def test_unreadable_file_starts_empty(cache_path):
+    with open(cache_path, "wb") as f:
+        f.write(b"not an npz file")
+    semantic_cache = SemanticCache(cache_path)
+    assert semantic_cache.lookup([1.0, 0.0]) is None
+    semantic_cache.set("a", [1.0, 0.0], "plan a")
+    assert SemanticCache(cache_path).lookup([1.0, 0.0]) == ("a", "plan a")
+
+def test_save_creates_missing_directory(tmp_path):
+    path = tmp_path / "temp" / "plan_cache.npz"
+    SemanticCache(str(path)).set("a", [1.0, 0.0], "plan a")
+    assert path.exists()
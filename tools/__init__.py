@@ -1,3 +1,22 @@
-from .code_execution import execute_code, code_interpreter
-from .file_operations import read_file, write_file, get_dataframe
-from .azure_tools import create_search_index, upload_to_search_index, search_index
\ No newline at end of file
+import importlib
+
+# Exported tools and the submodule defining each; submodules are imported on
+# first access (PEP 562) so unused tools don't load pandas or the Azure SDK
+_EXPORTS = {
+    "execute_code": ".code_execution",
+    "code_interpreter": ".code_execution",
+    "read_file": ".file_operations",
+    "read_file_full": ".file_operations",
+    "write_file": ".file_operations",
+    "get_dataframe": ".file_operations",
+    "create_search_index": ".azure_tools",
+    "upload_to_search_index": ".azure_tools",
+    "search_index": ".azure_tools",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
@@ -1,5 +1,7 @@
 import os
 import time
+import itertools
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 import pandas as pd
 from typing import Dict, Any, List, Optional, Union
 from dotenv import load_dotenv
@@ -16,6 +18,8 @@ from azure.search.documents.indexes.models import (
 from azure.core.credentials import AzureKeyCredential
 from langchain_core.tools import tool
 
+from .file_operations import peek_is_jsonl
+
 # Load environment variables
 load_dotenv()
 
@@ -24,6 +28,9 @@ AZURE_SEARCH_SERVICE = os.getenv("AZURE_SEARCH_SERVICE")
 AZURE_SEARCH_KEY = os.getenv("AZURE_SEARCH_KEY")
 AZURE_SEARCH_INDEX = os.getenv("AZURE_SEARCH_INDEX")
 
+# Upload batches sent to the service at the same time
+UPLOAD_CONCURRENCY = 8
+
 def get_search_index_client():
     """Get Azure Search Index client"""
     if not all([AZURE_SEARCH_SERVICE, AZURE_SEARCH_KEY]):
@@ -45,23 +52,44 @@ def get_search_client(index_name):
         credential=AzureKeyCredential(AZURE_SEARCH_KEY)
     )
 
+# Azure Search field type for each supported type name
+_TYPE_MAP = {
+    "string": SearchFieldDataType.String,
+    "int": SearchFieldDataType.Int32,
+    "integer": SearchFieldDataType.Int32,
+    "long": SearchFieldDataType.Int64,
+    "double": SearchFieldDataType.Double,
+    "boolean": SearchFieldDataType.Boolean,
+    "date": SearchFieldDataType.DateTimeOffset,
+    "datetime": SearchFieldDataType.DateTimeOffset,
+    "point": SearchFieldDataType.GeographyPoint,
+    "collection": SearchFieldDataType.Collection(SearchFieldDataType.String),
+    "complex": None  # Complex fields need special handling
+}
+
+# Type names indexed as searchable text
+_TEXT_TYPES = frozenset({"string", "text"})
+
 def get_field_type(field_type: str) -> SearchFieldDataType:
     """Convert string field type to Azure Search field type"""
-    type_mapping = {
-        "string": SearchFieldDataType.STRING,
-        "int": SearchFieldDataType.INT32,
-        "integer": SearchFieldDataType.INT32,
-        "long": SearchFieldDataType.INT64,
-        "double": SearchFieldDataType.DOUBLE,
-        "boolean": SearchFieldDataType.BOOLEAN,
-        "date": SearchFieldDataType.DATE_TIME_OFFSET,
-        "datetime": SearchFieldDataType.DATE_TIME_OFFSET,
-        "point": SearchFieldDataType.GEOGRAPHY_POINT,
-        "collection": SearchFieldDataType.COLLECTION(SearchFieldDataType.STRING),
-        "complex": None  # Complex fields need special handling
-    }
-    
-    return type_mapping.get(field_type.lower(), SearchFieldDataType.STRING)
+    return _TYPE_MAP.get(field_type.lower(), SearchFieldDataType.String)
+
+def _simple_field_factory(field_type: SearchFieldDataType):
+    """Return a builder of filterable, non-searchable fields of one type"""
+    return lambda name, key: SimpleField(name=name, type=field_type, key=key)
+
+def _searchable_field(name: str, key: bool) -> SearchField:
+    """Build a searchable text field; the key field stays a simple string field"""
+    if key:
+        return SimpleField(name=name, type=SearchFieldDataType.String, key=True)
+    return SearchableField(name=name, type=SearchFieldDataType.String)
+
+# Field builder for each type name, taking the field name and whether it is the key
+_FIELD_FACTORY = {
+    **{type_name: _simple_field_factory(field_type) for type_name, field_type in _TYPE_MAP.items()},
+    **{type_name: _searchable_field for type_name in _TEXT_TYPES},
+}
+_DEFAULT_FIELD_FACTORY = _simple_field_factory(SearchFieldDataType.String)
 
 @tool
 def create_search_index(index_name: str, fields: List[str], field_types: List[str]) -> Dict[str, Any]:
@@ -85,25 +113,11 @@ def create_search_index(index_name: str, fields: List[str], field_types: List[st
         
         client = get_search_index_client()
         
-        # Define fields for the index
-        search_fields = []
-        
-        for i, (field, field_type) in enumerate(zip(fields, field_types)):
-            # Key field (first field is always the key)
-            if i == 0:
-                search_fields.append(
-                    SimpleField(name=field, type=get_field_type(field_type), key=True)
-                )
-            # Searchable text fields
-            elif field_type.lower() in ["string", "text"]:
-                search_fields.append(
-                    SearchableField(name=field, type=SearchFieldDataType.STRING)
-                )
-            # Other field types
-            else:
-                search_fields.append(
-                    SimpleField(name=field, type=get_field_type(field_type))
-                )
+        # Define fields for the index; the first field is always the key
+        search_fields = [
+            _FIELD_FACTORY.get(field_type.lower(), _DEFAULT_FIELD_FACTORY)(field, i == 0)
+            for i, (field, field_type) in enumerate(zip(fields, field_types))
+        ]
         
         # Create the index
         index = SearchIndex(name=index_name, fields=search_fields)
@@ -128,72 +142,104 @@ def upload_to_search_index(index_name: str, data_source: Union[str, List[Dict[st
     
     Args:
         index_name: Name of the index to upload to
-        data_source: Either a file path to a CSV/Excel/JSON file or a list of dictionaries
+        data_source: Either a file path to a CSV/Excel/JSON/JSON Lines file or a list of dictionaries
         field_mappings: Optional mapping between source fields and index fields
     
     Returns:
         Dictionary containing success flag, number of documents uploaded, and error message if any
     """
     try:
-        # Load data
+        # Upload data in batches of 1000 documents
+        batch_size = 1000
+        
+        # Load data as a stream of batches, so large CSV and JSON Lines files are
+        # never held in memory at once and uploading starts after the first chunk
         if isinstance(data_source, str):
             # Assuming it's a file path
             if data_source.endswith('.csv'):
-                df = pd.read_csv(data_source)
+                chunks = pd.read_csv(data_source, chunksize=batch_size)
+            elif data_source.endswith(('.json', '.jsonl')) and peek_is_jsonl(data_source):
+                chunks = pd.read_json(data_source, lines=True, chunksize=batch_size)
             elif data_source.endswith(('.xlsx', '.xls')):
-                df = pd.read_excel(data_source)
+                chunks = [pd.read_excel(data_source)]
             elif data_source.endswith('.json'):
-                df = pd.read_json(data_source)
+                chunks = [pd.read_json(data_source)]
             else:
                 return {
                     "success": False,
                     "error": f"Unsupported file type: {data_source}"
                 }
             
-            # Convert DataFrame to list of dictionaries
-            data = df.to_dict(orient='records')
+            # Apply field mappings if provided, renaming the mapped columns of each chunk at once
+            if field_mappings:
+                chunks = (
+                    chunk[[column for column in field_mappings if column in chunk.columns]].rename(columns=field_mappings)
+                    for chunk in chunks
+                )
+            
+            # Convert each DataFrame chunk to lists of dictionaries, zipping the column
+            # names with plain row tuples instead of building records through to_dict
+            batches = (
+                [dict(zip(columns, row)) for row in chunk.iloc[i:i+batch_size].itertuples(index=False, name=None)]
+                for chunk in chunks
+                for columns in [chunk.columns.tolist()]
+                for i in range(0, len(chunk), batch_size)
+            )
         else:
             # Assuming it's already a list of dictionaries
-            data = data_source
-        
-        # Apply field mappings if provided
-        if field_mappings:
-            mapped_data = []
-            for item in data:
-                mapped_item = {}
-                for source_field, index_field in field_mappings.items():
-                    if source_field in item:
-                        mapped_item[index_field] = item[source_field]
-                mapped_data.append(mapped_item)
-            data = mapped_data
+            batches = (data_source[i:i+batch_size] for i in range(0, len(data_source), batch_size))
+            
+            # Apply field mappings if provided
+            if field_mappings:
+                mappings = field_mappings.items()
+                batches = (
+                    [{index_field: item[source_field] for source_field, index_field in mappings if source_field in item} for item in batch]
+                    for batch in batches
+                )
         
         # Get search client
         search_client = get_search_client(index_name)
         
-        # Upload data in batches
-        batch_size = 1000
-        for i in range(0, len(data), batch_size):
-            batch = data[i:i+batch_size]
-            result = search_client.upload_documents(documents=batch)
+        total_documents = 0
+        uploaded_documents = 0
+        failed_docs = []
+        
+        def collect(future):
+            nonlocal uploaded_documents
+            for doc in future.result():
+                if doc.succeeded:
+                    uploaded_documents += 1
+                else:
+                    failed_docs.append((doc.key, doc.error_message))
+        
+        # Overlap the round trips of independent batches, bounding how many
+        # parsed batches wait in memory for an upload slot
+        with ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY) as executor:
+            pending = set()
+            for batch in batches:
+                total_documents += len(batch)
+                pending.add(executor.submit(search_client.upload_documents, documents=batch))
+                if len(pending) >= 2 * UPLOAD_CONCURRENCY:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future)
             
             # Check if any document failed to upload
-            if any(not succeeded for succeeded in [doc.succeeded for doc in result]):
-                failed_docs = [
-                    (doc.key, doc.error_message)
-                    for doc in result
-                    if not doc.succeeded
-                ]
-                return {
-                    "success": False,
-                    "error": f"Some documents failed to upload: {failed_docs}",
-                    "total_documents": len(data),
-                    "uploaded_documents": i + sum(1 for doc in result if doc.succeeded)
-                }
+            for future in as_completed(pending):
+                collect(future)
+        
+        if failed_docs:
+            return {
+                "success": False,
+                "error": f"Some documents failed to upload: {failed_docs}",
+                "total_documents": total_documents,
+                "uploaded_documents": uploaded_documents
+            }
         
         return {
             "success": True,
-            "message": f"Successfully uploaded {len(data)} documents to index '{index_name}'.",
-            "total_documents": len(data)
+            "message": f"Successfully uploaded {total_documents} documents to index '{index_name}'.",
+            "total_documents": total_documents
         }
         
     except Exception as e:
@@ -203,7 +249,7 @@ def upload_to_search_index(index_name: str, data_source: Union[str, List[Dict[st
         }
 
 @tool
-def search_index(index_name: str, query: str, top: int = 10) -> Dict[str, Any]:
+def search_index(index_name: str, query: str, top: int = 10, select: Optional[List[str]] = None) -> Dict[str, Any]:
     """
     Search an Azure Cognitive Search index
     
@@ -211,6 +257,7 @@ def search_index(index_name: str, query: str, top: int = 10) -> Dict[str, Any]:
         index_name: Name of the index to search
         query: Search query text
         top: Maximum number of results to return (default: 10)
+        select: Optional list of fields to return for each result (default: all fields)
     
     Returns:
         Dictionary containing search results and metadata
@@ -221,11 +268,12 @@ def search_index(index_name: str, query: str, top: int = 10) -> Dict[str, Any]:
         results = search_client.search(
             search_text=query,
             top=top,
+            select=select,
             include_total_count=True
         )
         
-        # Convert results to list of dictionaries
-        documents = [doc for doc in results]
+        # Convert results to list of dictionaries, stopping at top so no further page is fetched
+        documents = [dict(doc) for doc in itertools.islice(results, top)]
         
         return {
             "success": True,
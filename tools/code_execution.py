@@ -3,23 +3,29 @@ import io
 from typing import Dict, Any, List, Tuple
 import traceback
 import contextlib
+import functools
+import threading
+import types
 from langchain_core.tools import tool
 
+# Module names that executed code commonly binds and that aren't worth reporting
+_SKIP = frozenset(("contextlib", "io", "sys"))
+
+# Variables larger than this many bytes are left out of the result
+MAX_VARIABLE_SIZE = 1 << 20
+
+# Redirecting output swaps the process-wide sys.stdout/sys.stderr, so code runs
+# one snippet at a time even when tool calls execute in parallel threads
+_EXEC_LOCK = threading.Lock()
+
 class CodeExecutionError(Exception):
     """Exception raised for errors in code execution."""
     pass
 
-@contextlib.contextmanager
-def capture_stdout_stderr():
-    """Context manager to capture stdout and stderr"""
-    old_stdout, old_stderr = sys.stdout, sys.stderr
-    stdout = io.StringIO()
-    stderr = io.StringIO()
-    sys.stdout, sys.stderr = stdout, stderr
-    try:
-        yield stdout, stderr
-    finally:
-        sys.stdout, sys.stderr = old_stdout, old_stderr
+@functools.lru_cache(maxsize=128)
+def _compile(code: str) -> types.CodeType:
+    """Compile source once, so snippets the agent re-runs while fixing errors skip parsing"""
+    return compile(code, "<agent>", "exec")
 
 @tool
 def execute_code(code: str) -> Dict[str, Any]:
@@ -30,28 +36,30 @@ def execute_code(code: str) -> Dict[str, Any]:
         code: The Python code to execute
     
     Returns:
-        Dictionary containing execution success flag, output, and error message if any
+        Dictionary containing execution success flag, output, error message if any,
+        and the type and a short repr of each variable the code defined
     """
     local_vars = {}
+    stdout, stderr = io.StringIO(), io.StringIO()
     
-    with capture_stdout_stderr() as (stdout, stderr):
+    with _EXEC_LOCK, contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
         try:
-            exec(code, globals(), local_vars)
-            output = stdout.getvalue()
+            exec(_compile(code), globals(), local_vars)
             error = stderr.getvalue()
             success = not error or error.strip() == ""
         except Exception as e:
-            output = stdout.getvalue()
             error = f"{str(e)}\n{traceback.format_exc()}"
             success = False
+    output = stdout.getvalue()
     
     return {
         "success": success,
         "output": output,
         "error": error if not success else "",
-        "variables": {k: v for k, v in local_vars.items() 
-                    if not k.startswith('_') and k != 'contextlib' and k != 'io' and k != 'sys'
-                    and not callable(v) and not isinstance(v, type)}
+        "variables": {k: {"type": type(v).__name__, "repr": repr(v)[:200]}
+                    for k, v in local_vars.items()
+                    if k[0] != "_" and k not in _SKIP and not callable(v) and not isinstance(v, type)
+                    and sys.getsizeof(v) <= MAX_VARIABLE_SIZE}
     }
 
 @tool
@@ -1,20 +1,110 @@
 import os
 import json
 import csv
+import functools
 import pandas as pd
 from typing import Dict, Any, List, Optional, Union
 from langchain_core.tools import tool
 
+def prefetch_files(file_paths: List[str]) -> None:
+    """
+    Ask the kernel to start reading files into the page cache ahead of use
+    
+    Args:
+        file_paths: Paths of the files that are about to be read
+    """
+    # posix_fadvise is only available on Linux and some other POSIX systems
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for file_path in file_paths:
+        try:
+            fd = os.open(file_path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+def peek_is_jsonl(file_path: str) -> bool:
+    """
+    Check whether a file holds JSON Lines rather than a single JSON document
+    
+    Args:
+        file_path: Path to the file to check
+    
+    Returns:
+        True for a .jsonl file, or for a file whose first two lines are each a JSON object
+    """
+    if file_path.lower().endswith('.jsonl'):
+        return True
+    with open(file_path, 'rb') as f:
+        first = f.readline().strip()
+        while not first and f.peek(1):
+            first = f.readline().strip()
+        # Only the start of the second record is needed
+        second = f.readline(512).lstrip()
+    # A complete first line plus the start of a second record; a pretty-printed
+    # document's first line is just "{" and a compact one has no second line
+    return first.startswith(b'{') and first.endswith(b'}') and second.startswith(b'{')
+
+@functools.lru_cache(maxsize=8)
+def _read_dataframe(file_path: str, mtime: float, size: int) -> pd.DataFrame:
+    # mtime and size are part of the cache key so a changed file is parsed again
+    file_extension = os.path.splitext(file_path)[1].lower()
+    if file_extension == '.csv':
+        return pd.read_csv(file_path)
+    if file_extension in ['.xlsx', '.xls']:
+        return pd.read_excel(file_path)
+    if file_extension in ['.json', '.jsonl'] and peek_is_jsonl(file_path):
+        # Parse line-delimited records in chunks rather than as one document
+        return pd.concat(pd.read_json(file_path, lines=True, chunksize=100_000), ignore_index=True)
+    if file_extension == '.json':
+        return pd.read_json(file_path)
+    raise ValueError(f"Unsupported file type: {file_extension}")
+
+def load_dataframe(file_path: str) -> pd.DataFrame:
+    """
+    Read a CSV, Excel, JSON or JSON Lines file into a DataFrame, reusing the parsed frame
+    while the file is unchanged
+    
+    Args:
+        file_path: Path to the file to read
+    
+    Returns:
+        The parsed DataFrame, shared between callers so it must not be modified
+    """
+    stat = os.stat(file_path)
+    return _read_dataframe(os.path.abspath(file_path), stat.st_mtime, stat.st_size)
+
+def numeric_stats(df: pd.DataFrame) -> Dict[str, Dict[str, float]]:
+    """
+    Summarize the numeric columns of a DataFrame in one vectorized pass
+    
+    Args:
+        df: DataFrame to summarize
+    
+    Returns:
+        Dictionary mapping each numeric column to its min, max, mean and std
+    """
+    numeric = df.select_dtypes(include="number")
+    if numeric.empty:
+        return {}
+    return numeric.agg(["min", "max", "mean", "std"]).to_dict()
+
 @tool
 def read_file(file_path: str) -> Dict[str, Any]:
     """
-    Read a file and return its contents
+    Read a file and return its contents; CSV, Excel and JSON Lines files are summarized
+    with a sample of rows rather than returned in full
     
     Args:
         file_path: Path to the file to read
     
     Returns:
-        Dictionary containing success flag, content, and error message if any
+        Dictionary containing success flag, content or table summary, and error message if any
     """
     try:
         if not os.path.exists(file_path):
@@ -27,27 +117,44 @@ def read_file(file_path: str) -> Dict[str, Any]:
         _, file_extension = os.path.splitext(file_path)
         
         if file_extension.lower() in ['.csv']:
-            df = pd.read_csv(file_path)
+            df = load_dataframe(file_path)
             return {
                 "success": True,
-                "content": df.to_dict(orient='records'),
+                "path": file_path,
                 "sample": df.head(5).to_dict(orient='records'),
                 "columns": df.columns.tolist(),
                 "shape": df.shape,
+                "rowcount": df.shape[0],
+                "numeric_stats": numeric_stats(df),
                 "file_type": "csv"
             }
         
         elif file_extension.lower() in ['.xlsx', '.xls']:
-            df = pd.read_excel(file_path)
+            df = load_dataframe(file_path)
             return {
                 "success": True,
-                "content": df.to_dict(orient='records'),
+                "path": file_path,
                 "sample": df.head(5).to_dict(orient='records'),
                 "columns": df.columns.tolist(),
                 "shape": df.shape,
+                "rowcount": df.shape[0],
+                "numeric_stats": numeric_stats(df),
                 "file_type": "excel"
             }
             
+        elif file_extension.lower() in ['.json', '.jsonl'] and peek_is_jsonl(file_path):
+            df = load_dataframe(file_path)
+            return {
+                "success": True,
+                "path": file_path,
+                "sample": df.head(5).to_dict(orient='records'),
+                "columns": df.columns.tolist(),
+                "shape": df.shape,
+                "rowcount": df.shape[0],
+                "numeric_stats": numeric_stats(df),
+                "file_type": "jsonl"
+            }
+            
         elif file_extension.lower() in ['.json']:
             with open(file_path, 'r') as f:
                 content = json.load(f)
@@ -73,6 +180,65 @@ def read_file(file_path: str) -> Dict[str, Any]:
             "error": str(e)
         }
 
+@tool
+def read_file_full(file_path: str) -> Dict[str, Any]:
+    """
+    Read every row of a CSV, Excel, JSON or JSON Lines file; use only when the sample from read_file is not enough
+    
+    Args:
+        file_path: Path to the file to read
+    
+    Returns:
+        Dictionary containing success flag, all rows as content, and error message if any
+    """
+    try:
+        if not os.path.exists(file_path):
+            return {
+                "success": False,
+                "content": "",
+                "error": f"File not found: {file_path}"
+            }
+        
+        _, file_extension = os.path.splitext(file_path)
+        
+        if file_extension.lower() not in ['.csv', '.xlsx', '.xls', '.json', '.jsonl']:
+            return {
+                "success": False,
+                "content": "",
+                "error": f"Unsupported file type: {file_extension}. Use read_file for other files."
+            }
+        
+        if file_extension.lower() in ['.json', '.jsonl']:
+            if not peek_is_jsonl(file_path):
+                # A single JSON document is returned whole
+                with open(file_path, 'r') as f:
+                    content = json.load(f)
+                return {
+                    "success": True,
+                    "content": content,
+                    "file_type": "json"
+                }
+            file_type = "jsonl"
+        else:
+            file_type = "csv" if file_extension.lower() == '.csv' else "excel"
+        
+        # JSON Lines files are parsed with read_json(lines=True) by load_dataframe
+        df = load_dataframe(file_path)
+        return {
+            "success": True,
+            "content": df.to_dict(orient='records'),
+            "columns": df.columns.tolist(),
+            "shape": df.shape,
+            "file_type": file_type
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "content": "",
+            "error": str(e)
+        }
+
 @tool
 def write_file(file_path: str, content: Union[str, List, Dict]) -> Dict[str, Any]:
     """
@@ -156,18 +322,23 @@ def get_dataframe(file_path: str) -> Dict[str, Any]:
         
         _, file_extension = os.path.splitext(file_path)
         
-        if file_extension.lower() in ['.csv']:
-            df = pd.read_csv(file_path)
-        elif file_extension.lower() in ['.xlsx', '.xls']:
-            df = pd.read_excel(file_path)
-        elif file_extension.lower() in ['.json']:
-            df = pd.read_json(file_path)
-        else:
+        if file_extension.lower() not in ['.csv', '.xlsx', '.xls', '.json', '.jsonl']:
             return {
                 "success": False,
                 "error": f"Unsupported file type: {file_extension}"
             }
         
+        df = load_dataframe(file_path)
+        
+        if file_extension.lower() == '.csv':
+            read_call = f"pd.read_csv('{file_path}')"
+        elif file_extension.lower() in ['.xlsx', '.xls']:
+            read_call = f"pd.read_excel('{file_path}')"
+        elif peek_is_jsonl(file_path):
+            read_call = f"pd.read_json('{file_path}', lines=True)"
+        else:
+            read_call = f"pd.read_json('{file_path}')"
+        
         # Convert DataFrame to a variable that can be used in code execution
         # This is a placeholder - the actual implementation will depend on how 
         # this interacts with the code execution tool
@@ -176,8 +347,9 @@ def get_dataframe(file_path: str) -> Dict[str, Any]:
             "columns": df.columns.tolist(),
             "shape": df.shape,
             "dtypes": {col: str(dtype) for col, dtype in zip(df.columns, df.dtypes)},
+            "numeric_stats": numeric_stats(df),
             "head": df.head(5).to_dict(orient='records'),
-            "dataframe_code": f"df = pd.read_{'csv' if file_extension.lower() == '.csv' else 'excel' if file_extension.lower() in ['.xlsx', '.xls'] else 'json'}('{file_path}')"
+            "dataframe_code": f"df = {read_call}"
         }
         
         return df_info
@@ -1 +1,19 @@
-from .openai_client import get_openai_client, get_langchain_openai_client
\ No newline at end of file
+import importlib
+
+# Exported names and the submodule defining each; submodules are imported on
+# first access (PEP 562) so the OpenAI SDK and numpy load only when used
+_EXPORTS = {
+    "get_openai_client": ".openai_client",
+    "get_langchain_openai_client": ".openai_client",
+    "get_langchain_openai_embeddings": ".openai_client",
+    "reset_clients": ".openai_client",
+    "TTLCache": ".cache",
+    "SemanticCache": ".semantic_cache",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
@@ -1,34 +1,83 @@
 import os
+import functools
 from typing import Optional
+import httpx
 from dotenv import load_dotenv
 from openai import AzureOpenAI
-from langchain_openai import AzureChatOpenAI
+from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
 
 # Load environment variables
 load_dotenv()
 
+# Keep-alive pool shared by the HTTP/2 connections of a chat client
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20)
+
+# Clients are cached by their full configuration, so their connection pools and
+# tokenizers are reused across requests and a changed configuration gets a new client
+
+def _azure_config():
+    """Return the Azure OpenAI API version, endpoint and key from the environment"""
+    return (
+        os.getenv("AZURE_OPENAI_API_VERSION", "2023-07-01-preview"),
+        os.getenv("AZURE_OPENAI_ENDPOINT"),
+        os.getenv("AZURE_OPENAI_API_KEY"),
+    )
+
+@functools.lru_cache(maxsize=8)
+def _openai_client(api_version, endpoint, api_key):
+    return AzureOpenAI(
+        api_key=api_key,
+        api_version=api_version,
+        azure_endpoint=endpoint
+    )
+
+@functools.lru_cache(maxsize=8)
+def _chat_client(model, api_version, endpoint, api_key):
+    return AzureChatOpenAI(
+        azure_deployment=model,
+        openai_api_version=api_version,
+        azure_endpoint=endpoint,
+        api_key=api_key,
+        temperature=0.2,
+        http_client=httpx.Client(http2=True, limits=HTTP_LIMITS),
+        http_async_client=httpx.AsyncClient(http2=True, limits=HTTP_LIMITS),
+    )
+
+@functools.lru_cache(maxsize=8)
+def _embeddings_client(model, api_version, endpoint, api_key):
+    return AzureOpenAIEmbeddings(
+        azure_deployment=model,
+        openai_api_version=api_version,
+        azure_endpoint=endpoint,
+        api_key=api_key,
+        http_client=httpx.Client(http2=True, limits=HTTP_LIMITS),
+        http_async_client=httpx.AsyncClient(http2=True, limits=HTTP_LIMITS),
+    )
+
 def get_openai_client():
     """
     Initialize and return the Azure OpenAI client
     """
-    client = AzureOpenAI(
-        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-        api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2023-07-01-preview"),
-        azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
-    )
-    return client
+    return _openai_client(*_azure_config())
 
 def get_langchain_openai_client(model_name: Optional[str] = None):
     """
     Initialize and return a LangChain Azure OpenAI client
     """
     model = model_name or os.getenv("AZURE_OPENAI_MODEL", "gpt-4")
-    
-    client = AzureChatOpenAI(
-        azure_deployment=model,
-        openai_api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2023-07-01-preview"),
-        azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-        temperature=0.2,
-    )
-    return client
\ No newline at end of file
+    return _chat_client(model, *_azure_config())
+
+def get_langchain_openai_embeddings(model_name: Optional[str] = None):
+    """
+    Initialize and return a LangChain Azure OpenAI embeddings client
+    """
+    model = model_name or os.getenv("AZURE_OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+    return _embeddings_client(model, *_azure_config())
+
+def reset_clients() -> None:
+    """
+    Discard the cached clients so clients for a replaced configuration are released
+    """
+    _openai_client.cache_clear()
+    _chat_client.cache_clear()
+    _embeddings_client.cache_clear()
@@ -0,0 +1,91 @@
+import os
+import threading
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+import orjson
+
+class SemanticCache:
+    """
+    Thread-safe cache that returns the value stored for the most similar previous
+    key embedding, persisted to an .npz file so it survives restarts
+    """
+    def __init__(self, path: str, threshold: float = 0.93, maxsize: int = 512):
+        self.path = path
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self._embeddings = np.empty((0, 0), dtype=np.float32)
+        self._keys: List[str] = []
+        self._values: List[Any] = []
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _load(self) -> None:
+        """Load previously persisted entries, starting empty if there are none"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                embeddings = data["embeddings"]
+                entries = orjson.loads(str(data["entries"]))
+        except (OSError, ValueError, KeyError):
+            return
+        self._embeddings = embeddings.astype(np.float32)
+        self._keys = [entry["key"] for entry in entries]
+        self._values = [entry["value"] for entry in entries]
+
+    def _save(self) -> None:
+        entries = [{"key": key, "value": value} for key, value in zip(self._keys, self._values)]
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp.npz"
+        np.savez(tmp_path, embeddings=self._embeddings, entries=np.array(orjson.dumps(entries).decode()))
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, embedding: Sequence[float]) -> Optional[Tuple[str, Any]]:
+        """Return the key and value of the most similar entry if it reaches the threshold, else None"""
+        query = self._normalize(embedding)
+        with self._lock:
+            if not self._keys or self._embeddings.shape[1] != query.shape[0]:
+                return None
+            # Rows are unit vectors, so the dot product is the cosine similarity
+            similarities = self._embeddings @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            return self._keys[best], self._values[best]
+
+    def set(self, key: str, embedding: Sequence[float], value: Any) -> None:
+        """Store value for key, replacing any previous entry and evicting the oldest when full"""
+        vector = self._normalize(embedding)
+        with self._lock:
+            if self._keys and self._embeddings.shape[1] != vector.shape[0]:
+                # The embedding model changed, so earlier entries are not comparable
+                self._embeddings = np.empty((0, vector.shape[0]), dtype=np.float32)
+                self._keys, self._values = [], []
+            self._remove(key)
+            rows = self._embeddings if self._keys else np.empty((0, vector.shape[0]), dtype=np.float32)
+            self._embeddings = np.vstack([rows, vector])[-self.maxsize:]
+            self._keys = (self._keys + [key])[-self.maxsize:]
+            self._values = (self._values + [value])[-self.maxsize:]
+            self._save()
+
+    def pop(self, key: str) -> None:
+        """Remove the entry stored for key if present"""
+        with self._lock:
+            if self._remove(key):
+                self._save()
+
+    def _remove(self, key: str) -> bool:
+        if key not in self._keys:
+            return False
+        index = self._keys.index(key)
+        self._embeddings = np.delete(self._embeddings, index, axis=0)
+        del self._keys[index]
+        del self._values[index]
+        return True